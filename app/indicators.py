@@ -0,0 +1,281 @@
+"""
+Indicateurs techniques, chacun en deux versions qui donnent les memes valeurs:
+  - noyau batch NumPy pour l'historique: f(arrays) -> ndarray (NaN pendant le warm-up)
+  - noyau streaming O(1) pour les bougies live: Classe(...).update(...) -> valeur ou None
+
+Conventions (identiques batch / streaming):
+  - EMA amorcee par la moyenne simple des `period` premieres valeurs
+  - RSI et ATR lisses a la Wilder (alpha = 1/period), amorces par une moyenne simple
+  - Bollinger: ecart-type de population (ddof=0)
+  - VWAP cumule depuis le debut de la serie, prix typique (high + low + close) / 3
+"""
+from collections import deque
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _as_float(x):
+    return np.asarray(x, dtype=np.float64)
+
+
+def _recursive_smooth(x, alpha, seed_idx):
+    """
+    y[seed_idx] = mean(x[:seed_idx + 1]), puis y[i] = y[i-1] + alpha * (x[i] - y[i-1]).
+    La recurrence n'est pas vectorisable sans perte de precision: boucle sur une liste
+    Python (bien plus rapide que l'indexation element par element d'un ndarray).
+    """
+    out = np.full(len(x), np.nan)
+    if seed_idx >= len(x):
+        return out
+    vals = x.tolist()
+    y = sum(vals[:seed_idx + 1]) / (seed_idx + 1)
+    res = [y]
+    for v in vals[seed_idx + 1:]:
+        y += alpha * (v - y)
+        res.append(y)
+    out[seed_idx:] = res
+    return out
+
+
+# --- batch ---
+
+def sma(x, period):
+    x = _as_float(x)
+    out = np.full(len(x), np.nan)
+    if period <= len(x):
+        csum = np.cumsum(np.insert(x, 0, 0.0))
+        out[period - 1:] = (csum[period:] - csum[:-period]) / period
+    return out
+
+
+def ema(x, period):
+    return _recursive_smooth(_as_float(x), 2.0 / (period + 1), period - 1)
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """Retourne (macd, signal, histogramme)."""
+    close = _as_float(close)
+    line = ema(close, fast) - ema(close, slow)
+    sig = np.full(len(close), np.nan)
+    start = slow - 1
+    if start < len(close):
+        sig[start:] = ema(line[start:], signal)
+    return line, sig, line - sig
+
+
+def bollinger(close, period=20, k=2.0):
+    """Retourne (milieu, bande haute, bande basse)."""
+    close = _as_float(close)
+    mid = sma(close, period)
+    std = np.full(len(close), np.nan)
+    if period <= len(close):
+        win = sliding_window_view(close, period)
+        std[period - 1:] = win.std(axis=1)
+        # Fenetre constante: valeurs exactes, comme le noyau streaming
+        flat = np.flatnonzero(win.max(axis=1) == win.min(axis=1))
+        std[period - 1 + flat] = 0.0
+        mid[period - 1 + flat] = win[flat, 0]
+    return mid, mid + k * std, mid - k * std
+
+
+def true_range(high, low, close):
+    high, low, close = _as_float(high), _as_float(low), _as_float(close)
+    tr = high - low
+    if len(close) > 1:
+        prev = close[:-1]
+        tr[1:] = np.maximum.reduce([tr[1:], np.abs(high[1:] - prev), np.abs(low[1:] - prev)])
+    return tr
+
+
+def atr(high, low, close, period=14):
+    return _recursive_smooth(true_range(high, low, close), 1.0 / period, period - 1)
+
+
+def vwap(high, low, close, volume):
+    high, low, close, volume = _as_float(high), _as_float(low), _as_float(close), _as_float(volume)
+    typical = (high + low + close) / 3.0
+    cum_vol = np.cumsum(volume)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out = np.cumsum(typical * volume) / cum_vol
+    out[cum_vol == 0] = np.nan
+    return out
+
+
+def _rsi_from_avgs(avg_gain, avg_loss):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rsi = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    # Pas de baisse: 100 (ou 50 si marche plat)
+    flat = avg_loss == 0
+    rsi[flat] = np.where(avg_gain[flat] > 0, 100.0, 50.0)
+    return rsi
+
+
+def rsi(close, period=14):
+    """RSI de Wilder. Premiere valeur a l'index `period` (il faut period variations)."""
+    close = _as_float(close)
+    out = np.full(len(close), np.nan)
+    if len(close) <= period:
+        return out
+    change = np.diff(close)
+    avg_gain = _recursive_smooth(np.clip(change, 0, None), 1.0 / period, period - 1)
+    avg_loss = _recursive_smooth(np.clip(-change, 0, None), 1.0 / period, period - 1)
+    out[period:] = _rsi_from_avgs(avg_gain[period - 1:], avg_loss[period - 1:])
+    return out
+
+
+# --- streaming ---
+
+class Sma:
+    def __init__(self, period):
+        self.period = period
+        self._window = deque()
+        self._sum = 0.0
+        self.value = None
+
+    def update(self, x):
+        x = float(x)
+        self._window.append(x)
+        self._sum += x
+        if len(self._window) > self.period:
+            self._sum -= self._window.popleft()
+        if len(self._window) == self.period:
+            self.value = self._sum / self.period
+        return self.value
+
+
+class _Smoother:
+    """Lissage exponentiel amorce par la moyenne des `period` premieres valeurs."""
+
+    def __init__(self, period, alpha):
+        self.period = period
+        self.alpha = alpha
+        self._n = 0
+        self._sum = 0.0
+        self.value = None
+
+    def update(self, x):
+        x = float(x)
+        if self.value is None:
+            self._n += 1
+            self._sum += x
+            if self._n == self.period:
+                self.value = self._sum / self.period
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+
+class Ema(_Smoother):
+    def __init__(self, period):
+        super().__init__(period, 2.0 / (period + 1))
+
+
+class Macd:
+    """update(close) -> (macd, signal, histogramme); composantes None pendant le warm-up."""
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self._fast = Ema(fast)
+        self._slow = Ema(slow)
+        self._signal = Ema(signal)
+        self.value = (None, None, None)
+
+    def update(self, close):
+        f = self._fast.update(close)
+        s = self._slow.update(close)
+        if f is None or s is None:
+            return self.value
+        line = f - s
+        sig = self._signal.update(line)
+        self.value = (line, sig, None if sig is None else line - sig)
+        return self.value
+
+
+class Bollinger:
+    """update(close) -> (milieu, haute, basse) ou None. Moyenne / M2 glissants (Welford)."""
+
+    def __init__(self, period=20, k=2.0):
+        self.period = period
+        self.k = k
+        self._window = deque()
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._flat = 0  # nb de closes identiques consecutifs
+        self.value = None
+
+    def update(self, close):
+        x = float(close)
+        self._flat = self._flat + 1 if self._window and x == self._window[-1] else 1
+        self._window.append(x)
+        if len(self._window) <= self.period:
+            n = len(self._window)
+            delta = x - self._mean
+            self._mean += delta / n
+            self._m2 += delta * (x - self._mean)
+        else:
+            old = self._window.popleft()
+            prev_mean = self._mean
+            self._mean += (x - old) / self.period
+            self._m2 += (x - old) * (x - self._mean + old - prev_mean)
+        if self._flat >= self.period:
+            # Fenetre constante: valeurs exactes (et purge de la derive d'arrondi)
+            self._mean, self._m2 = x, 0.0
+        if len(self._window) == self.period:
+            std = max(self._m2 / self.period, 0.0) ** 0.5
+            self.value = (self._mean, self._mean + self.k * std, self._mean - self.k * std)
+        return self.value
+
+
+class Atr:
+    def __init__(self, period=14):
+        self._smooth = _Smoother(period, 1.0 / period)
+        self._prev_close = None
+        self.value = None
+
+    def update(self, high, low, close):
+        high, low, close = float(high), float(low), float(close)
+        tr = high - low
+        if self._prev_close is not None:
+            tr = max(tr, abs(high - self._prev_close), abs(low - self._prev_close))
+        self._prev_close = close
+        self.value = self._smooth.update(tr)
+        return self.value
+
+
+class Vwap:
+    def __init__(self):
+        self._pv = 0.0
+        self._vol = 0.0
+        self.value = None
+
+    def update(self, high, low, close, volume):
+        volume = float(volume)
+        self._pv += (float(high) + float(low) + float(close)) / 3.0 * volume
+        self._vol += volume
+        if self._vol > 0:
+            self.value = self._pv / self._vol
+        return self.value
+
+
+class Rsi:
+    """RSI de Wilder en O(1) par bougie."""
+
+    def __init__(self, period=14):
+        self._gain = _Smoother(period, 1.0 / period)
+        self._loss = _Smoother(period, 1.0 / period)
+        self._prev = None
+        self.value = None
+
+    def update(self, close):
+        close = float(close)
+        if self._prev is not None:
+            change = close - self._prev
+            g = self._gain.update(max(change, 0.0))
+            l = self._loss.update(max(-change, 0.0))
+            if g is not None:
+                if l == 0:
+                    self.value = 100.0 if g > 0 else 50.0
+                else:
+                    self.value = 100.0 - 100.0 / (1.0 + g / l)
+        self._prev = close
+        return self.value
@@ -23,7 +23,14 @@ def env_bool(name, default='true'):
 
 
 class Bot:
-    def __init__(self):
+    def __init__(self, symbol=None, exchange=None, market=None, rate_limiter=None, clock=time):
+        """
+        symbol / exchange : surcharges optionnelles (sinon lus depuis l'env).
+        market : source de bougies market(symbol, interval, limit) -> DataFrame,
+                 par defaut poll_klines sur l'exchange (REST).
+        rate_limiter : limiteur d'ordres partage (voir supervisor.SharedRateLimiter).
+        clock : source de temps exposant time() et sleep() (virtuelle en replay).
+        """
         load_dotenv()
 
         # Config YAML (niveau de log, fichier, etc.)
@@ -31,9 +38,11 @@ class Bot:
             cfg = yaml.safe_load(f)
         self.log = setup_logger(cfg['logging']['level'], cfg['logging']['file'])
         self.total_pnl = 0.0
+        self.clock = clock
+        self.last_tick_ts = None
 
         # Parametres principaux
-        self.symbol = os.getenv('SYMBOL', 'BTCUSDT')
+        self.symbol = symbol or os.getenv('SYMBOL', 'BTCUSDT')
         self.interval = os.getenv('INTERVAL', '1m')
         self.poll_seconds = int(os.getenv('POLL_SECONDS', '4'))
         self.base_order_usdt = float(os.getenv('BASE_ORDER_USDT', '25'))
@@ -41,8 +50,11 @@ class Bot:
         testnet = env_bool('BINANCE_TESTNET', 'true')
 
         # Exchange
-        bx_cfg = BinanceExchange.env_from_os(testnet)
-        self.ex = BinanceExchange(bx_cfg)
+        if exchange is None:
+            bx_cfg = BinanceExchange.env_from_os(testnet)
+            exchange = BinanceExchange(bx_cfg)
+        self.ex = exchange
+        self.market = market or (lambda sym, itv, limit: poll_klines(self.ex, sym, itv, limit=limit))
 
         # Strategie SMA
         sma_short = int(os.getenv('SMA_SHORT', '20'))
@@ -76,100 +88,115 @@ class Bot:
             take_profit_pct=float(os.getenv('TAKE_PROFIT_PCT', '0.06')),
             max_orders_per_min=int(os.getenv('MAX_OPEN_ORDERS_PER_MIN', '3')),
         )
-        self.om = OrderManager(self.ex, self.log, self.risk, dry_run=dry_run)
+        self.om = OrderManager(self.ex, self.log, self.risk, dry_run=dry_run,
+                               rate_limiter=rate_limiter, clock=clock)
+        self.pos = Position(symbol=self.symbol)
+
+    def tick(self):
+        """Un passage complet: market data -> strategie -> execution -> SL/TP."""
+        self.log.info("")
+        self.log.info("[TICK] Nouveau tick...")
+        self.last_tick_ts = self.clock.time()
+
+        # 1) Market data
+        df = self.market(self.symbol, self.interval, 200)
+        df = self.strategy.compute(df)
+
+        # 2) Strategie
+        sig = self.strategy.signal(df)
+
+        last = df.iloc[-1]
+        prev = df.iloc[-2]
+        price = float(last["close"])
+        sma_s = float(last["sma_short"])
+        sma_l = float(last["sma_long"])
+        gap = sma_s - sma_l
+        prev_gap = float(prev["sma_short"]) - float(prev["sma_long"])
+        threshold = max(
+            self.strategy.p.min_gap_usdt,
+            price * self.strategy.p.min_gap_pct
+        )
+
+        # 3) Logs lisibles
+        self.log.info("[SMA] %s %s", self.symbol, self.interval)
+        self.log.info("   Dernier prix : %.2f USDT", price)
+        self.log.info("   SMA%d = %.2f | SMA%d = %.2f", self.strategy.p.short, sma_s, self.strategy.p.long, sma_l)
+        self.log.info("   Ecart SMA : %+.2f | Seuil requis >= %.2f", gap, threshold)
+
+        info = getattr(self.strategy, "last_info", {}) or {}
+        trend = info.get("trend", "?")
+        cross = info.get("cross", "none")
+        why = info.get("why", "")
+        confirm_need = int(info.get("confirm_needed", self.strategy.p.confirm_bars))
+        confirm_cnt = int(info.get("confirm_count", 0))
+        near = bool(info.get("near_cross", False))
+
+        if sig in ("BUY", "SELL"):
+            self.log.info("[ACTION] Signal %s valide.", sig)
+        else:
+            self.log.info("[INFO] Aucun signal.")
+            self.log.info("   Tendance : %s | Croisement : %s | Confirmation : %d/%d",
+                          trend, cross, confirm_cnt, confirm_need)
+            if near:
+                self.log.info("   Alerte: croisement proche (retournement detecte, seuil non atteint).")
+            if why:
+                self.log.info("   Raison : %s", why)
+
+        # 4) Execution
+        last_price = price
+        if sig == 'BUY' and not self.pos.is_open():
+            qty = self.om.calc_quantity_from_usdt(self.symbol, self.base_order_usdt, last_price)
+            if qty > 0 and self.om.market_buy(self.symbol, qty):
+                self.pos.qty = qty
+                self.pos.entry_price = last_price
+                self.log.info("[POSITION] Ouverte: qty=%s @ %.2f", qty, last_price)
+                log_trade(symbol=self.symbol, side="BUY", price=last_price, quantity=qty, ts=self.last_tick_ts)
+
+        elif sig == 'SELL':
+            if self.pos.is_open():
+                if self.om.market_sell(self.symbol, self.pos.qty):
+                    self._close_position(last_price)
+            else:
+                self.log.info("[VENTE] Signal SELL ignore (aucune position ouverte).")
+
+        # 5) SL / TP
+        self.check_risk(last_price)
+
+    def check_risk(self, price):
+        """SL / TP seuls au prix `price` (sans recalcul de strategie): appelable a chaque ticker."""
+        if not self.pos.is_open():
+            return
+        pnl_pct = (price - self.pos.entry_price) / self.pos.entry_price
+        if pnl_pct <= -self.risk.stop_loss_pct:
+            self.log.warning("[RISK] Stop-loss declenche.")
+            # Vente refusee (rate limit, erreur): on garde la position pour le tick suivant
+            if self.om.market_sell(self.symbol, self.pos.qty):
+                self._close_position(price)
+        elif pnl_pct >= self.risk.take_profit_pct:
+            self.log.info("[RISK] Take-profit atteint.")
+            if self.om.market_sell(self.symbol, self.pos.qty):
+                self._close_position(price)
+
+    def _close_position(self, price):
+        """Position vendue a `price`: PnL realise comptabilise, position remise a zero."""
+        pnl = self.pos.unrealized_pnl(price)
+        self.total_pnl += pnl
+        self.log.info("[POSITION] Fermee | PnL ~= %.2f USDT | PnL total : %.2f USDT",
+                      pnl, self.total_pnl)
         self.pos = Position(symbol=self.symbol)
 
     def run_forever(self):
         self.log.info("[LOOP] Boucle de trading demarree.")
         while True:
             try:
-                self.log.info("")
-                self.log.info("[TICK] Nouveau tick...")
-
-                # 1) Market data
-                df = poll_klines(self.ex, self.symbol, self.interval, limit=200)
-                df = self.strategy.compute(df)
-
-                # 2) Strategie
-                sig = self.strategy.signal(df)
-
-                last = df.iloc[-1]
-                prev = df.iloc[-2]
-                price = float(last["close"])
-                sma_s = float(last["sma_short"])
-                sma_l = float(last["sma_long"])
-                gap = sma_s - sma_l
-                prev_gap = float(prev["sma_short"]) - float(prev["sma_long"])
-                threshold = max(
-                    self.strategy.p.min_gap_usdt,
-                    price * self.strategy.p.min_gap_pct
-                )
-
-                # 3) Logs lisibles
-                self.log.info("[SMA] %s %s", self.symbol, self.interval)
-                self.log.info("   Dernier prix : %.2f USDT", price)
-                self.log.info("   SMA%d = %.2f | SMA%d = %.2f", self.strategy.p.short, sma_s, self.strategy.p.long, sma_l)
-                self.log.info("   Ecart SMA : %+.2f | Seuil requis >= %.2f", gap, threshold)
-
-                info = getattr(self.strategy, "last_info", {}) or {}
-                trend = info.get("trend", "?")
-                cross = info.get("cross", "none")
-                why = info.get("why", "")
-                confirm_need = int(info.get("confirm_needed", self.strategy.p.confirm_bars))
-                confirm_cnt = int(info.get("confirm_count", 0))
-                near = bool(info.get("near_cross", False))
-
-                if sig in ("BUY", "SELL"):
-                    self.log.info("[ACTION] Signal %s valide.", sig)
-                else:
-                    self.log.info("[INFO] Aucun signal.")
-                    self.log.info("   Tendance : %s | Croisement : %s | Confirmation : %d/%d",
-                                  trend, cross, confirm_cnt, confirm_need)
-                    if near:
-                        self.log.info("   Alerte: croisement proche (retournement detecte, seuil non atteint).")
-                    if why:
-                        self.log.info("   Raison : %s", why)
-
-                # 4) Execution
-                last_price = price
-                if sig == 'BUY' and not self.pos.is_open():
-                    qty = self.om.calc_quantity_from_usdt(self.symbol, self.base_order_usdt, last_price)
-                    if qty > 0 and self.om.market_buy(self.symbol, qty):
-                        self.pos.qty = qty
-                        self.pos.entry_price = last_price
-                        self.log.info("[POSITION] Ouverte: qty=%s @ %.2f", qty, last_price)
-                        log_trade(symbol=self.symbol, side="BUY", price=last_price, quantity=qty)
-
-                elif sig == 'SELL':
-                    if self.pos.is_open():
-                        if self.om.market_sell(self.symbol, self.pos.qty):
-                            pnl = self.pos.unrealized_pnl(last_price)
-                            self.total_pnl += pnl
-                            self.log.info("[POSITION] Fermee | PnL ~= %.2f USDT | PnL total : %.2f USDT",
-                                          pnl, self.total_pnl)
-                            self.pos = Position(symbol=self.symbol)
-                    else:
-                        self.log.info("[VENTE] Signal SELL ignore (aucune position ouverte).")
-
-                # 5) SL / TP
-                if self.pos.is_open():
-                    pnl_pct = (last_price - self.pos.entry_price) / self.pos.entry_price
-                    if pnl_pct <= -self.risk.stop_loss_pct:
-                        self.log.warning("[RISK] Stop-loss declenche.")
-                        self.om.market_sell(self.symbol, self.pos.qty)
-                        self.pos = Position(symbol=self.symbol)
-                    elif pnl_pct >= self.risk.take_profit_pct:
-                        self.log.info("[RISK] Take-profit atteint.")
-                        self.om.market_sell(self.symbol, self.pos.qty)
-                        self.pos = Position(symbol=self.symbol)
-
+                self.tick()
             except KeyboardInterrupt:
                 self.log.info("[EXIT] Arret manuel (CTRL+C).")
                 break
             except Exception as e:
                 self.log.exception("[ERROR] Boucle: erreur inattendue: %s", e)
 
-            time.sleep(self.poll_seconds)
+            self.clock.sleep(self.poll_seconds)
 
 
 if __name__ == '__main__':
@@ -1,5 +1,10 @@
+import numpy as np
 import pandas as pd
 
+# Colonnes numeriques conservees pour le partage / replay des bougies
+KLINE_FIELDS = ['open_time', 'open', 'high', 'low', 'close', 'volume']
+
+
 def klines_to_df(klines):
     """Convertit les bougies Binance en DataFrame pandas."""
     cols = [
@@ -24,4 +29,16 @@ def klines_to_df(klines):
 def poll_klines(exchange, symbol, interval, limit=200):
     """Récupère les dernières bougies et retourne un DataFrame."""
     klines = exchange.fetch_klines(symbol, interval, limit)
-    return klines_to_df(klines)
\ No newline at end of file
+    return klines_to_df(klines)
+
+
+def klines_to_array(klines):
+    """Convertit les bougies Binance en ndarray float64 (n, 6) sur KLINE_FIELDS."""
+    return np.array([k[:len(KLINE_FIELDS)] for k in klines], dtype=np.float64).reshape(-1, len(KLINE_FIELDS))
+
+
+def array_to_df(arr):
+    """Inverse de klines_to_array: ndarray (n, 6) -> DataFrame compatible strategies."""
+    df = pd.DataFrame(arr, columns=KLINE_FIELDS)
+    df['open_time'] = df['open_time'].astype('int64')
+    return df
@@ -20,20 +20,26 @@ class RiskConfig:
 
 
 class OrderManager:
-    def __init__(self, exchange, logger, risk: RiskConfig, dry_run=True):
+    def __init__(self, exchange, logger, risk: RiskConfig, dry_run=True, rate_limiter=None, clock=time):
         self.ex = exchange
         self.log = logger
         self.risk = risk
         self.dry_run = dry_run
+        # Limiteur global partage entre process (supervisor), en plus de la fenetre locale
+        self.rate_limiter = rate_limiter
+        self.clock = clock
         self._sent = []
 
-    def _rate_limit_ok(self):
-        now = time.time()
+    def _acquire(self):
+        """Reserve un slot d'ordre. Retourne False si une limite/minute (locale ou globale) est atteinte."""
+        now = self.clock.time()
         self._sent = [t for t in self._sent if now - t < 60]
-        return len(self._sent) < self.risk.max_orders_per_min
-
-    def _mark_sent(self):
-        self._sent.append(time.time())
+        if len(self._sent) >= self.risk.max_orders_per_min:
+            return False
+        if self.rate_limiter is not None and not self.rate_limiter.try_acquire():
+            return False
+        self._sent.append(now)
+        return True
 
     def calc_quantity_from_usdt(self, symbol, usdt_amount, price):
         info = self.ex.precision_info(symbol) or {'min_qty': 0.0, 'step_size': 0.0}
@@ -42,10 +48,9 @@ class OrderManager:
         return max(qty, info['min_qty']) if info['min_qty'] else qty
 
     def market_buy(self, symbol, qty):
-        if not self._rate_limit_ok():
+        if not self._acquire():
             self.log.warning('Rate limit atteint, achat ignoré')
             return None
-        self._mark_sent()
         if self.dry_run:
             self.log.info(f'[DRY-RUN] BUY {symbol} qty={qty}')
             return {'status': 'FILLED', 'orderId': 'DRYRUN-BUY'}
@@ -58,10 +63,9 @@ class OrderManager:
             return None
 
     def market_sell(self, symbol, qty):
-        if not self._rate_limit_ok():
+        if not self._acquire():
             self.log.warning('Rate limit atteint, vente ignorée')
             return None
-        self._mark_sent()
         if self.dry_run:
             self.log.info(f'[DRY-RUN] SELL {symbol} qty={qty}')
             return {'status': 'FILLED', 'orderId': 'DRYRUN-SELL'}
@@ -0,0 +1,334 @@
+"""
+Enregistrement / rejeu deterministe d'une session Bot.
+
+Format: fichier gzip en append (une session par entete meta), une ligne JSON par evenement:
+  {"k": "meta", "v": 1, "env": {...}}                      entete de session
+  {"k": "call", "m": <methode>, "a": [args], "r": <reponse>} appel exchange reussi
+  {"k": "call", "m": "fetch_klines", "a": [args], "d": [o, n, [lignes]]}
+      bougies en delta de la reponse precedente aux memes args: prev[o:o + n] + lignes
+  {"k": "err", "m": <methode>, "a": [args], "e": <type>, "msg": <texte>}
+  {"k": "time", "t": <epoch>}                               lecture d'horloge (debut de tick, rate limit)
+
+L'env de l'entete contient les valeurs resolues (.env compris); None = defaut du Bot.
+
+Le rejeu repasse ces evenements au Bot inchange avec une horloge virtuelle (sleep
+instantane), sans aucun appel reseau, pour reproduire un incident ou profiler la
+boucle sur une journee realiste.
+"""
+import gzip
+import json
+import os
+import time
+import zlib
+
+from dotenv import load_dotenv
+
+from . import trade_logger
+
+FORMAT_VERSION = 2
+SUPPORTED_VERSIONS = (1, 2)
+
+# Parametres lus par Bot dans l'env: figes dans l'entete pour rejouer les memes decisions
+ENV_KEYS = [
+    'SYMBOL', 'INTERVAL', 'POLL_SECONDS', 'BASE_ORDER_USDT', 'DRY_RUN', 'BINANCE_TESTNET',
+    'SMA_SHORT', 'SMA_LONG', 'SMA_SEUIL_MIN', 'SMA_SEUIL_PCT', 'SMA_CONFIRM_BARS',
+    'STOP_LOSS_PCT', 'TAKE_PROFIT_PCT', 'MAX_OPEN_ORDERS_PER_MIN',
+]
+
+# Methodes BinanceExchange utilisees par Bot / OrderManager / portfolio
+EXCHANGE_METHODS = [
+    'get_symbol_price', 'fetch_klines', 'get_asset_balance', 'order_market', 'precision_info',
+]
+
+
+# BaseException et non Exception: Bot.run_forever et OrderManager interceptent
+# Exception, ces signaux doivent les traverser pour arreter le rejeu.
+class ReplayStop(BaseException):
+    pass
+
+
+class ReplayFinished(ReplayStop):
+    """Fin de l'enregistrement atteinte."""
+
+
+class ReplayDivergence(ReplayStop):
+    """Le Bot rejoue n'emet pas la meme sequence d'appels que la session enregistree."""
+
+
+class RecordedError(Exception):
+    """Exception exchange rejouee (type d'origine conserve dans `kind`)."""
+
+    def __init__(self, kind, msg):
+        super().__init__(f'{kind}: {msg}')
+        self.kind = kind
+
+
+def _is_complete(path):
+    """True si le flux gzip se lit jusqu'au bout (pas de session interrompue en queue)."""
+    try:
+        with gzip.open(path, 'rb') as f:
+            while f.read(1 << 20):
+                pass
+        return True
+    except (EOFError, gzip.BadGzipFile, zlib.error):
+        return False
+
+
+class Recorder:
+    """
+    Ajoute une session a `path`. Un fichier laisse tronque par un process mort est
+    d'abord renomme en <path>.<epoch>.partial (toujours rejouable): une session
+    ajoutee derriere un flux gzip sans trailer serait illisible.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.moved_partial = None
+        if os.path.exists(path) and not _is_complete(path):
+            self.moved_partial = f'{path}.{int(time.time())}.partial'
+            os.replace(path, self.moved_partial)
+        self._f = gzip.open(path, 'ab')
+        # Meme resolution que Bot.__init__: les cles du .env sont figees elles aussi
+        load_dotenv()
+        self.write({'k': 'meta', 'v': FORMAT_VERSION, 'env': {k: os.getenv(k) for k in ENV_KEYS}})
+
+    def write(self, event):
+        self._f.write(json.dumps(event, separators=(',', ':')).encode('utf-8') + b'\n')
+
+    def flush(self):
+        # Sync flush: le fichier reste lisible jusqu'ici meme si le process meurt
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+
+def klines_delta(prev, rows):
+    """
+    Encode `rows` par rapport a la reponse precedente `prev` (memes args): (o, n, nouvelles)
+    tel que rows == prev[o:o + n] + nouvelles, ou None sans recouvrement.
+    Fenetre glissante: seules la bougie en cours et les nouvelles sont ecrites.
+    """
+    if not prev or not rows:
+        return None
+    first = rows[0][0]
+    o = next((i for i, r in enumerate(prev) if r[0] == first), None)
+    if o is None:
+        return None
+    n = 0
+    while n < len(rows) and o + n < len(prev) and rows[n] == prev[o + n]:
+        n += 1
+    return o, n, rows[n:]
+
+
+class RecordingExchange:
+    """Enveloppe un BinanceExchange et enregistre chaque reponse (ou erreur)."""
+
+    def __init__(self, inner, recorder: Recorder):
+        self.inner = inner
+        self.rec = recorder
+        self._last_klines = {}  # args -> derniere reponse fetch_klines
+
+    def __getattr__(self, name):
+        attr = getattr(self.inner, name)
+        if name not in EXCHANGE_METHODS:
+            return attr
+
+        def call(*args):
+            try:
+                result = attr(*args)
+            except Exception as e:
+                self.rec.write({'k': 'err', 'm': name, 'a': list(args), 'e': type(e).__name__, 'msg': str(e)})
+                raise
+            event = {'k': 'call', 'm': name, 'a': list(args), 'r': result}
+            if name == 'fetch_klines':
+                key = json.dumps(list(args))
+                delta = klines_delta(self._last_klines.get(key), result)
+                if delta is not None:
+                    del event['r']
+                    event['d'] = list(delta)
+                self._last_klines[key] = list(result)
+            self.rec.write(event)
+            return result
+        return call
+
+
+class RecordingClock:
+    """
+    Horloge reelle dont chaque lecture est enregistree. Flush une fois par tick, avant
+    l'attente: un process mort ne perd que le tick en cours.
+    """
+
+    def __init__(self, recorder: Recorder):
+        self.rec = recorder
+
+    def time(self):
+        t = time.time()
+        self.rec.write({'k': 'time', 't': t})
+        return t
+
+    def sleep(self, seconds):
+        self.rec.flush()
+        time.sleep(seconds)
+
+
+def _read_event(f):
+    """
+    Evenement suivant, ou None en fin de fichier. Un process mort en cours de session
+    laisse un flux gzip sans trailer et parfois une derniere ligne partielle: cette
+    queue tronquee est traitee comme la fin de l'enregistrement.
+    """
+    try:
+        line = f.readline()
+        if not line.endswith(b'\n'):
+            return None
+        return json.loads(line)
+    except (EOFError, ValueError, gzip.BadGzipFile, zlib.error):
+        return None
+
+
+def count_sessions(path):
+    """Nombre de sessions (entetes meta) enregistrees dans `path`."""
+    n = 0
+    with gzip.open(path, 'rb') as f:
+        while True:
+            ev = _read_event(f)
+            if ev is None:
+                return n
+            n += ev['k'] == 'meta'
+
+
+class ReplaySource:
+    """
+    Lit une session enregistree et sert ses evenements dans l'ordre.
+    session: index de la session dans le fichier (negatif depuis la fin, -1 = la derniere).
+    """
+
+    def __init__(self, path, session=-1):
+        total = count_sessions(path)
+        if total == 0:
+            raise ValueError(f"{path}: entete de session absente")
+        idx = session + total if session < 0 else session
+        if not 0 <= idx < total:
+            raise ValueError(f"{path}: session {session} inexistante ({total} sessions)")
+        self._f = gzip.open(path, 'rb')
+        seen = -1
+        while seen < idx:
+            header = _read_event(self._f)
+            seen += header['k'] == 'meta'
+        if header.get('v') not in SUPPORTED_VERSIONS:
+            raise ValueError(f"{path}: version de format non supportee ({header.get('v')})")
+        self.env = header.get('env', {})
+        self.consumed = 0
+
+    def next(self, kind, method=None, args=None):
+        ev = _read_event(self._f)
+        # Une nouvelle entete marque le debut de la session suivante dans le meme fichier
+        if ev is None or ev['k'] == 'meta':
+            raise ReplayFinished()
+        self.consumed += 1
+        if kind == 'time':
+            if ev['k'] != 'time':
+                raise ReplayDivergence(f"evenement #{self.consumed}: attendu lecture d'horloge, enregistre {ev['k']} {ev.get('m')}")
+            return ev
+        if ev['k'] not in ('call', 'err') or ev['m'] != method or ev['a'] != json.loads(json.dumps(list(args))):
+            raise ReplayDivergence(f"evenement #{self.consumed}: appel {method}{tuple(args)} "
+                                   f"!= enregistre {ev['k']} {ev.get('m')}{tuple(ev.get('a', []))}")
+        return ev
+
+    def close(self):
+        self._f.close()
+
+
+class ReplayExchange:
+    """Exchange sans reseau: renvoie les reponses enregistrees."""
+
+    def __init__(self, source: ReplaySource):
+        self.src = source
+        self._last_klines = {}
+
+    def __getattr__(self, name):
+        if name not in EXCHANGE_METHODS:
+            raise AttributeError(name)
+
+        def call(*args):
+            ev = self.src.next('call', name, args)
+            if ev['k'] == 'err':
+                raise RecordedError(ev['e'], ev['msg'])
+            if name != 'fetch_klines':
+                return ev['r']
+            key = json.dumps(list(args))
+            if 'd' in ev:
+                o, n, rows = ev['d']
+                result = self._last_klines[key][o:o + n] + rows
+            else:
+                result = ev['r']
+            self._last_klines[key] = result
+            return list(result)
+        return call
+
+
+class VirtualClock:
+    """Horloge rejouee: time() renvoie les instants enregistres, sleep() est instantane."""
+
+    def __init__(self, source: ReplaySource):
+        self.src = source
+        self.now = None
+
+    def time(self):
+        self.now = self.src.next('time')['t']
+        return self.now
+
+    def sleep(self, seconds):
+        pass
+
+
+def record_bot(path, exchange):
+    """Prepare un Bot enregistreur: retourne (exchange, clock, recorder) a lui passer."""
+    rec = Recorder(path)
+    return RecordingExchange(exchange, rec), RecordingClock(rec), rec
+
+
+def _set_env(values):
+    """Applique {cle: valeur} a os.environ; None retire la cle."""
+    for k, v in values.items():
+        if v is None:
+            os.environ.pop(k, None)
+        else:
+            os.environ[k] = v
+
+
+def replay_session(path, trades_file=None, session=-1):
+    """
+    Rejoue une session de `path` (la derniere par defaut) a travers Bot.run_forever
+    aussi vite que possible.
+    Les trades rejoues vont dans `trades_file` (par defaut <path>.trades.csv).
+    Retourne le Bot en fin de rejeu (positions, total_pnl) pour inspection.
+    """
+    from . import main
+
+    src = ReplaySource(path, session=session)
+    prev_env = {k: os.environ.get(k) for k in src.env}
+    _set_env(src.env)
+
+    prev_trades = trade_logger.TRADE_LOG_FILE
+    trade_logger.TRADE_LOG_FILE = trades_file or f'{path}.trades.csv'
+    # Env de l'entete deja resolu: le .env courant ne doit pas remplir les cles
+    # enregistrees absentes (le Bot rejoue prendrait d'autres parametres)
+    prev_load_dotenv = main.load_dotenv
+    main.load_dotenv = lambda *args, **kwargs: False
+    try:
+        bot = main.Bot(exchange=ReplayExchange(src), clock=VirtualClock(src))
+        try:
+            bot.run_forever()
+        except ReplayFinished:
+            bot.log.info("[REPLAY] Fin de l'enregistrement (%d evenements).", src.consumed)
+        except ReplayDivergence as e:
+            bot.log.error("[REPLAY] Divergence: %s", e)
+            raise
+        return bot
+    finally:
+        main.load_dotenv = prev_load_dotenv
+        trade_logger.TRADE_LOG_FILE = prev_trades
+        _set_env(prev_env)
+        src.close()
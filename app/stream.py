@@ -0,0 +1,320 @@
+"""
+Flux market data push (asyncio) a la place du polling REST.
+
+Une seule connexion WebSocket multiplexee (combined stream Binance) porte les flux
+kline et ticker de tous les symboles. A chaque (re)connexion, le trou est comble par
+REST (fetch_klines) puis les bougies sont dispatchees: fermees (closed=True) et en
+cours (closed=False). serve_recorded() fournit un serveur local qui rejoue des
+messages enregistres (record_to) pour tester sans Binance.
+"""
+import asyncio
+import gzip
+import inspect
+import json
+import threading
+import time
+import zlib
+from collections import deque
+
+import websockets
+
+from . import trade_logger
+from .market import klines_to_df
+
+BINANCE_WS = 'wss://stream.binance.com:9443/stream'
+BINANCE_WS_TESTNET = 'wss://testnet.binance.vision/stream'
+
+
+def stream_url(symbols, interval, testnet=True, base=None):
+    """URL du combined stream: <sym>@kline_<interval> et <sym>@ticker pour chaque symbole."""
+    streams = []
+    for sym in symbols:
+        s = sym.lower()
+        streams += [f'{s}@kline_{interval}', f'{s}@ticker']
+    base = base or (BINANCE_WS_TESTNET if testnet else BINANCE_WS)
+    return f"{base}?streams={'/'.join(streams)}"
+
+
+def _kline_row(k):
+    """Kline WebSocket -> ligne au format REST get_klines (compatible klines_to_df)."""
+    return [k['t'], k['o'], k['h'], k['l'], k['c'], k['v'], k['T'], k['q'], k['n'], k['V'], k['Q'], '0']
+
+
+async def _maybe_await(result):
+    if inspect.isawaitable(result):
+        await result
+
+
+class MarketStream:
+    """
+    on_bar(symbol, row, closed) et on_ticker(symbol, price): callbacks sync ou async.
+    read(symbol, interval, limit) a la meme signature que Bot.market.
+    """
+
+    def __init__(self, symbols, interval, exchange, on_bar=None, on_ticker=None, url=None,
+                 limit=200, testnet=True, log=None, record_to=None,
+                 reconnect_min=1.0, reconnect_max=30.0):
+        self.symbols = [s.upper() for s in symbols]
+        self.interval = interval
+        self.ex = exchange
+        self.on_bar = on_bar
+        self.on_ticker = on_ticker
+        self.url = url or stream_url(self.symbols, interval, testnet)
+        self.limit = limit
+        self.log = log
+        self.reconnect_min = reconnect_min
+        self.reconnect_max = reconnect_max
+        self._bars = {s: deque(maxlen=limit) for s in self.symbols}
+        self._last_closed = {s: None for s in self.symbols}  # open_time de la derniere bougie fermee
+        self.prices = {}
+        self.reconnects = 0
+        self._record = gzip.open(record_to, 'ab') if record_to else None
+        self._stopped = False
+        self._stop_evt = asyncio.Event()
+        self._ws = None
+
+    # --- etat ---
+    def bars(self, symbol):
+        """Copie des bougies bufferisees (a prendre depuis la boucle asyncio)."""
+        return list(self._bars[symbol.upper()])
+
+    def read(self, symbol, interval=None, limit=None):
+        rows = self.bars(symbol)
+        if limit:
+            rows = rows[-int(limit):]
+        return klines_to_df(rows)
+
+    def _apply(self, symbol, row, closed):
+        """Fusionne une bougie dans le buffer. Retourne False si perimee ou deja vue."""
+        buf = self._bars[symbol]
+        t = int(row[0])
+        last_closed = self._last_closed[symbol]
+        if buf and t < int(buf[-1][0]):
+            return False
+        if last_closed is not None and t <= last_closed:
+            return False  # deja recue fermee (doublon stream / backfill)
+        if buf and t == int(buf[-1][0]):
+            buf[-1] = row
+        else:
+            buf.append(row)
+        if closed:
+            self._last_closed[symbol] = t
+        return True
+
+    async def _dispatch_bar(self, symbol, row, closed):
+        if self._apply(symbol, row, closed) and self.on_bar:
+            await _maybe_await(self.on_bar(symbol, row, closed))
+
+    # --- REST ---
+    async def _backfill(self, dispatch):
+        """Recharge les dernieres bougies par REST; dispatch les bougies manquees si dispatch."""
+        loop = asyncio.get_running_loop()
+        for sym in self.symbols:
+            rows = await loop.run_in_executor(None, self.ex.fetch_klines, sym, self.interval, self.limit)
+            now_ms = time.time() * 1000
+            for row in rows:
+                closed = int(row[6]) < now_ms
+                if dispatch:
+                    await self._dispatch_bar(sym, row, closed)
+                else:
+                    self._apply(sym, row, closed)
+
+    # --- WebSocket ---
+    async def _handle(self, raw):
+        if self._record is not None:
+            self._record.write((raw if isinstance(raw, str) else raw.decode('utf-8')).encode('utf-8') + b'\n')
+        msg = json.loads(raw)
+        data = msg.get('data', msg)  # combined stream ou flux simple
+        event = data.get('e')
+        if event == 'kline':
+            sym = data['s']
+            if sym in self._bars:
+                k = data['k']
+                await self._dispatch_bar(sym, _kline_row(k), bool(k['x']))
+        elif event == '24hrTicker':
+            sym = data['s']
+            price = float(data['c'])
+            self.prices[sym] = price
+            if self.on_ticker:
+                await _maybe_await(self.on_ticker(sym, price))
+
+    async def run(self):
+        """Boucle principale: connexion, backfill, lecture; reconnexion avec backoff exponentiel."""
+        try:
+            await self._run()
+        finally:
+            # Y compris sur annulation (CTRL+C): trailer gzip ecrit, fichier lisible
+            if self._record is not None:
+                self._record.close()
+                self._record = None
+
+    async def _run(self):
+        delay = self.reconnect_min
+        first = True
+        while not self._stopped:
+            try:
+                async with websockets.connect(self.url, ping_interval=20) as ws:
+                    self._ws = ws
+                    if self.log:
+                        self.log.info("[STREAM] Connecte: %s", self.url)
+                    # Abonne d'abord, backfill ensuite: les messages arrives entre-temps
+                    # attendent dans la socket, le trou est donc couvert des deux cotes.
+                    await self._backfill(dispatch=not first)
+                    first = False
+                    delay = self.reconnect_min
+                    async for raw in ws:
+                        await self._handle(raw)
+                if self.log and not self._stopped:
+                    self.log.warning("[STREAM] Connexion fermee par le serveur.")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self.log:
+                    self.log.warning("[STREAM] Connexion perdue: %s", e)
+            finally:
+                self._ws = None
+                if self._record is not None:
+                    self._record.flush()
+            if self._stopped:
+                break
+            self.reconnects += 1
+            if self.log:
+                self.log.info("[STREAM] Reconnexion dans %.1fs...", delay)
+            try:
+                await asyncio.wait_for(self._stop_evt.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, self.reconnect_max)
+
+    async def stop(self):
+        self._stopped = True
+        self._stop_evt.set()
+        if self._ws is not None:
+            await self._ws.close()
+
+
+def _read_messages(path):
+    """
+    Messages enregistres dans `path`. Comme replay._read_event, un enregistrement
+    interrompu (flux gzip sans trailer, derniere ligne partielle) s'arrete a la
+    derniere ligne complete.
+    """
+    messages = []
+    with gzip.open(path, 'rb') as f:
+        while True:
+            try:
+                line = f.readline()
+            except (EOFError, gzip.BadGzipFile, zlib.error):
+                break
+            if not line.endswith(b'\n'):
+                break
+            if line.strip():
+                messages.append(line.decode('utf-8').rstrip('\n'))
+    return messages
+
+
+async def serve_recorded(path, host='127.0.0.1', port=0, delay=0.0):
+    """
+    Serveur WebSocket local rejouant les messages de `path` (enregistres via record_to)
+    a chaque client, puis fermant la connexion. Retourne (server, url).
+    """
+    messages = _read_messages(path)
+
+    async def handler(ws, *_):
+        for m in messages:
+            await ws.send(m)
+            if delay:
+                await asyncio.sleep(delay)
+
+    server = await websockets.serve(handler, host, port)
+    port = server.sockets[0].getsockname()[1]
+    return server, f'ws://{host}:{port}/stream'
+
+
+class _BotRunner:
+    """
+    Execute les ticks d'un Bot dans un thread (pandas, appels REST bloquants), hors de la
+    boucle asyncio qui continue de lire la socket. Une file par bot garde l'ordre des bougies.
+    Entre deux bougies fermees, chaque ticker declenche un controle SL/TP (Bot.check_risk).
+    """
+
+    def __init__(self, bot, stream):
+        self.bot = bot
+        self.stream = stream
+        self.queue = asyncio.Queue()
+        self._rows = []
+        self._price = None  # dernier prix ticker pas encore controle
+        bot.market = self._market
+
+    def _market(self, symbol, interval, limit):
+        return klines_to_df(self._rows[-int(limit):] if limit else self._rows)
+
+    def submit(self):
+        # Instantane pris dans la boucle: le thread du tick ne lit jamais le buffer vivant
+        self.queue.put_nowait(('tick', self.stream.bars(self.bot.symbol)))
+
+    def submit_price(self, price):
+        # Un seul controle en attente: les tickers arrives entre-temps mettent a jour son prix
+        if not self.bot.pos.is_open():
+            return
+        pending = self._price is not None
+        self._price = price
+        if not pending:
+            self.queue.put_nowait(('risk', None))
+
+    async def run(self):
+        while True:
+            kind, rows = await self.queue.get()
+            try:
+                if kind == 'tick':
+                    self._rows = rows
+                    await asyncio.to_thread(self.bot.tick)
+                else:
+                    price, self._price = self._price, None
+                    await asyncio.to_thread(self.bot.check_risk, price)
+            except Exception as e:
+                self.bot.log.exception("[ERROR] Stream: erreur inattendue: %s", e)
+
+
+def run_bot_streaming(symbols=None, url=None, record_to=None):
+    """
+    Pilote un Bot par symbole depuis le flux push: un tick a chaque bougie fermee,
+    SL/TP controles a chaque ticker.
+    """
+    from .main import Bot
+
+    bots = {}
+    for sym in symbols or [None]:
+        ex = next(iter(bots.values())).ex if bots else None
+        bot = Bot(symbol=sym, exchange=ex)
+        bots[bot.symbol] = bot
+    first = next(iter(bots.values()))
+    stream = MarketStream(list(bots), first.interval, first.ex, url=url,
+                          testnet=first.ex.cfg.testnet, log=first.log, record_to=record_to)
+    runners = {sym: _BotRunner(bot, stream) for sym, bot in bots.items()}
+    # Ticks en parallele dans plusieurs threads: ecritures de trades.csv serialisees
+    if trade_logger.TRADE_LOG_LOCK is None:
+        trade_logger.TRADE_LOG_LOCK = threading.Lock()
+
+    def on_bar(symbol, row, closed):
+        if closed:
+            runners[symbol].submit()
+
+    def on_ticker(symbol, price):
+        runners[symbol].submit_price(price)
+
+    stream.on_bar = on_bar
+    stream.on_ticker = on_ticker
+
+    async def main():
+        tasks = [asyncio.create_task(r.run()) for r in runners.values()]
+        try:
+            await stream.run()
+        finally:
+            for t in tasks:
+                t.cancel()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        first.log.info("[EXIT] Arret manuel (CTRL+C).")
@@ -0,0 +1,364 @@
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
+import yaml
+from dotenv import load_dotenv
+
+from . import trade_logger
+from .logger import setup_logger
+from .exchange_binance import BinanceExchange
+from .market import KLINE_FIELDS, klines_to_array, array_to_df
+from .main import Bot, env_bool
+
+
+class SharedKlines:
+    """
+    Bougies de N symboles publiees une seule fois en memoire partagee.
+    Le superviseur ecrit (publish), les workers lisent (read) sans appel REST.
+    Layout: float64 (n_symbols, limit, len(KLINE_FIELDS)), lignes valides dans counts[i].
+    """
+
+    def __init__(self, symbols, limit=200, ctx=None):
+        ctx = ctx or mp.get_context()
+        self.symbols = list(symbols)
+        self.limit = int(limit)
+        self._index = {s: i for i, s in enumerate(self.symbols)}
+        nbytes = len(self.symbols) * self.limit * len(KLINE_FIELDS) * 8
+        self._shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+        self._owner = True
+        # Nb de lignes valides par symbole; son verrou protege aussi le buffer
+        self.counts = ctx.Array('i', len(self.symbols))
+        # Incremente a chaque publication complete (reveil des workers)
+        self.generation = ctx.Value('q', 0)
+        self._attach_view()
+
+    def _attach_view(self):
+        shape = (len(self.symbols), self.limit, len(KLINE_FIELDS))
+        self._buf = np.ndarray(shape, dtype=np.float64, buffer=self._shm.buf)
+
+    # Transmis aux workers par nom de segment, pas par copie
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_shm'] = self._shm.name
+        state['_owner'] = False
+        del state['_buf']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._shm = shared_memory.SharedMemory(name=state['_shm'])
+        self._attach_view()
+
+    def publish(self, symbol, klines):
+        arr = klines_to_array(klines)[-self.limit:]
+        i = self._index[symbol]
+        with self.counts.get_lock():
+            self._buf[i, :len(arr)] = arr
+            self.counts[i] = len(arr)
+
+    def bump(self):
+        with self.generation.get_lock():
+            self.generation.value += 1
+
+    def read(self, symbol, interval=None, limit=None):
+        """Meme signature que Bot.market: (symbol, interval, limit) -> DataFrame."""
+        i = self._index[symbol]
+        with self.counts.get_lock():
+            n = self.counts[i]
+            arr = self._buf[i, :n].copy()
+        if limit:
+            arr = arr[-int(limit):]
+        return array_to_df(arr)
+
+    def last_close(self, symbol):
+        i = self._index[symbol]
+        with self.counts.get_lock():
+            n = self.counts[i]
+            if n == 0:
+                return None
+            return float(self._buf[i, n - 1, KLINE_FIELDS.index('close')])
+
+    def close(self):
+        self._buf = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+class SharedRateLimiter:
+    """
+    Limite d'ordres par fenetre glissante, commune a tous les process.
+    Ring buffer des horodatages d'envoi: un slot est libre s'il est sorti de la fenetre.
+    """
+
+    def __init__(self, max_orders_per_min, window_seconds=60.0, ctx=None):
+        ctx = ctx or mp.get_context()
+        self.window = float(window_seconds)
+        self._stamps = ctx.Array('d', max(int(max_orders_per_min), 0))
+
+    def try_acquire(self):
+        now = time.time()
+        with self._stamps.get_lock():
+            for i in range(len(self._stamps)):
+                if now - self._stamps[i] >= self.window:
+                    self._stamps[i] = now
+                    return True
+        return False
+
+
+class WeightBudget:
+    """
+    Budget de poids de requetes REST (limite Binance par IP) sur fenetre glissante,
+    pour les threads de recuperation du superviseur.
+    """
+
+    def __init__(self, weight_per_min, window_seconds=60.0):
+        self.limit = int(weight_per_min)
+        self.window = float(window_seconds)
+        self._spent = []  # (horodatage, poids)
+        self._lock = threading.Lock()
+
+    def try_spend(self, weight):
+        now = time.time()
+        with self._lock:
+            self._spent = [(t, w) for t, w in self._spent if now - t < self.window]
+            if sum(w for _, w in self._spent) + weight > self.limit:
+                return False
+            self._spent.append((now, weight))
+            return True
+
+
+def klines_weight(limit):
+    """Poids Binance de GET /api/v3/klines selon `limit`."""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+def worker_log_path(file_path, worker_id):
+    """logs/bot.log -> logs/bot.worker<id>.log (RotatingFileHandler non partageable entre process)."""
+    p = Path(file_path)
+    return str(p.with_name(f'{p.stem}.worker{worker_id}{p.suffix}'))
+
+
+def _worker_main(worker_id, symbols, klines, limiter, status_q, stop, restore, log_cfg, trades_lock):
+    """Boucle d'un worker: un Bot par symbole du shard, reveille a chaque publication."""
+    # Handlers herites du superviseur (fork): fichier de log propre au worker
+    logger = logging.getLogger('firstapp')
+    for h in list(logger.handlers):
+        logger.removeHandler(h)
+    setup_logger(log_cfg['level'], worker_log_path(log_cfg['file'], worker_id))
+    trade_logger.TRADE_LOG_LOCK = trades_lock
+
+    bots = []
+    for sym in symbols:
+        ex = bots[0].ex if bots else None  # une seule connexion exchange par worker
+        bot = Bot(symbol=sym, exchange=ex, market=klines.read, rate_limiter=limiter)
+        if sym in restore:
+            qty, entry_price, total_pnl = restore[sym]
+            bot.pos.qty = qty
+            bot.pos.entry_price = entry_price
+            bot.total_pnl = total_pnl
+        bots.append(bot)
+
+    if bots:
+        bots[0].log.info("[WORKER %d] demarre (pid=%d) : %s", worker_id, os.getpid(), ",".join(symbols))
+    seen = -1
+    try:
+        while not stop.is_set():
+            gen = klines.generation.value
+            if gen == seen:
+                stop.wait(0.05)
+                continue
+            seen = gen
+            for bot in bots:
+                try:
+                    bot.tick()
+                except Exception as e:
+                    bot.log.exception("[ERROR] Worker %d / %s: erreur inattendue: %s", worker_id, bot.symbol, e)
+                status_q.put((bot.symbol, bot.pos.qty, bot.pos.entry_price, bot.total_pnl))
+    except KeyboardInterrupt:
+        pass
+
+
+class Supervisor:
+    """
+    Repartit les symboles sur plusieurs process workers executant la logique Bot.
+      - market data recuperee une seule fois et publiee via SharedKlines
+      - rate limit des ordres coordonne globalement (SharedRateLimiter)
+      - workers morts relances avec leurs positions connues
+      - agregation des positions et du PnL de tous les workers
+    """
+
+    def __init__(self, symbols, workers=None, limit=200):
+        load_dotenv()
+        with open('trading_bot/config.yaml', 'r', encoding='utf-8') as f:
+            cfg = yaml.safe_load(f)
+        self.log_cfg = cfg['logging']
+        self.log = setup_logger(self.log_cfg['level'], self.log_cfg['file'])
+
+        if not symbols:
+            raise ValueError("Supervisor: aucun symbole fourni.")
+        self.symbols = list(dict.fromkeys(symbols))
+        self.interval = os.getenv('INTERVAL', '1m')
+        self.poll_seconds = int(os.getenv('POLL_SECONDS', '4'))
+        self.limit = limit
+
+        n = min(workers or os.cpu_count() or 1, len(self.symbols))
+        self.shards = [self.symbols[i::n] for i in range(n)]
+
+        self.ex = BinanceExchange(BinanceExchange.env_from_os(env_bool('BINANCE_TESTNET', 'true')))
+        self.klines = SharedKlines(self.symbols, limit=limit)
+        # Budget d'ordres du compte, tous symboles confondus (independant du nombre de
+        # symboles); MAX_OPEN_ORDERS_PER_MIN reste la limite par bot
+        self.limiter = SharedRateLimiter(int(os.getenv('MAX_ORDERS_PER_MIN_GLOBAL', '10')))
+        # Market data: recuperation parallele bornee, sous budget de poids REST
+        self.fetch_pool = ThreadPoolExecutor(max_workers=int(os.getenv('FETCH_CONCURRENCY', '8')),
+                                             thread_name_prefix='klines')
+        self.weight_budget = WeightBudget(int(os.getenv('REST_WEIGHT_PER_MIN', '1200')))
+        self._fetch_offset = 0
+        self.trades_lock = mp.Lock()
+        self.status_q = mp.Queue()
+        self.stop = mp.Event()
+        self.procs = {}
+        # symbol -> (qty, entry_price, total_pnl), dernier etat remonte par les workers
+        self.status = {}
+
+        # Relances: backoff exponentiel, abandon apres max_restarts echecs rapproches
+        self.max_restarts = int(os.getenv('MAX_WORKER_RESTARTS', '5'))
+        self.restart_backoff_max = 60.0
+        self.stable_seconds = 60.0  # un worker ayant tenu aussi longtemps remet son compteur a zero
+        self._restarts = {}
+        self._started_at = {}
+        self._retry_at = {}
+        self._abandoned = set()
+
+        self.log.info("[SUPERVISOR] %d symboles sur %d workers | interval=%s",
+                      len(self.symbols), n, self.interval)
+
+    def _spawn(self, worker_id):
+        shard = self.shards[worker_id]
+        restore = {s: self.status[s] for s in shard if s in self.status}
+        p = mp.Process(
+            target=_worker_main,
+            args=(worker_id, shard, self.klines, self.limiter, self.status_q, self.stop, restore,
+                  self.log_cfg, self.trades_lock),
+            name=f'bot-worker-{worker_id}',
+            daemon=True,
+        )
+        p.start()
+        self.procs[worker_id] = p
+        self._started_at[worker_id] = time.time()
+
+    def _fetch(self, sym):
+        try:
+            self.klines.publish(sym, self.ex.fetch_klines(sym, self.interval, self.limit))
+        except Exception as e:
+            self.log.exception("[SUPERVISOR] Echec market data %s: %s", sym, e)
+
+    def _publish(self):
+        """
+        Recupere les bougies de tous les symboles en parallele (FETCH_CONCURRENCY threads).
+        Budget de poids epuise: les symboles restants gardent leurs donnees du cycle
+        precedent; le point de depart tourne pour ne pas affamer toujours les memes.
+        """
+        n = len(self.symbols)
+        order = [self.symbols[(self._fetch_offset + i) % n] for i in range(n)]
+        weight = klines_weight(self.limit)
+        batch = []
+        for sym in order:
+            if not self.weight_budget.try_spend(weight):
+                break
+            batch.append(sym)
+        self._fetch_offset = (self._fetch_offset + len(batch)) % n
+        if len(batch) < n:
+            self.log.warning("[SUPERVISOR] Budget de poids REST atteint: %d/%d symboles rafraichis.",
+                             len(batch), n)
+        list(self.fetch_pool.map(self._fetch, batch))
+        self.klines.bump()
+
+    def _drain_status(self):
+        while True:
+            try:
+                sym, qty, entry_price, total_pnl = self.status_q.get_nowait()
+            except queue.Empty:
+                return
+            self.status[sym] = (qty, entry_price, total_pnl)
+
+    def _check_workers(self):
+        now = time.time()
+        for worker_id, p in list(self.procs.items()):
+            if p.is_alive() or worker_id in self._abandoned:
+                continue
+            if worker_id not in self._retry_at:
+                if now - self._started_at.get(worker_id, now) >= self.stable_seconds:
+                    self._restarts[worker_id] = 0
+                n = self._restarts.get(worker_id, 0)
+                if n >= self.max_restarts:
+                    self.log.error("[SUPERVISOR] Worker %d (%s) abandonne apres %d relances (exitcode=%s).",
+                                   worker_id, ",".join(self.shards[worker_id]), n, p.exitcode)
+                    self._abandoned.add(worker_id)
+                    continue
+                delay = min(2.0 ** n, self.restart_backoff_max)
+                self.log.warning("[SUPERVISOR] Worker %d arrete (exitcode=%s), relance dans %.0fs (%d/%d).",
+                                 worker_id, p.exitcode, delay, n + 1, self.max_restarts)
+                self._retry_at[worker_id] = now + delay
+            if now >= self._retry_at[worker_id]:
+                del self._retry_at[worker_id]
+                self._restarts[worker_id] = self._restarts.get(worker_id, 0) + 1
+                self._spawn(worker_id)
+
+    def aggregate(self):
+        """Positions ouvertes, PnL realise et latent, tous workers confondus."""
+        open_positions, realized, unrealized = 0, 0.0, 0.0
+        for sym, (qty, entry_price, total_pnl) in self.status.items():
+            realized += total_pnl
+            if qty > 0:
+                open_positions += 1
+                price = self.klines.last_close(sym)
+                if price is not None:
+                    unrealized += (price - entry_price) * qty
+        return {'open_positions': open_positions, 'realized_pnl': realized, 'unrealized_pnl': unrealized}
+
+    def run_forever(self):
+        for worker_id in range(len(self.shards)):
+            self._spawn(worker_id)
+        try:
+            while True:
+                self._publish()
+                self._drain_status()
+                self._check_workers()
+                agg = self.aggregate()
+                self.log.info("[SUPERVISOR] Positions ouvertes: %d | PnL realise: %.2f USDT | PnL latent: %.2f USDT",
+                              agg['open_positions'], agg['realized_pnl'], agg['unrealized_pnl'])
+                time.sleep(self.poll_seconds)
+        except KeyboardInterrupt:
+            self.log.info("[EXIT] Arret manuel (CTRL+C).")
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        self.stop.set()
+        deadline = time.time() + 5
+        for p in self.procs.values():
+            # On vide la queue pendant l'attente: un worker bloque sur put() ne sortirait pas
+            while p.is_alive() and time.time() < deadline:
+                self._drain_status()
+                p.join(timeout=0.1)
+            if p.is_alive():
+                p.terminate()
+        self._drain_status()
+        self.fetch_pool.shutdown(wait=False)
+        self.klines.close()
@@ -1,19 +1,27 @@
 # trading_bot/app/trade_logger.py
 import csv
 import os
+from contextlib import nullcontext
 from datetime import datetime
 
 TRADE_LOG_FILE = "trades.csv"
+# Verrou inter-process optionnel (workers du supervisor ecrivant le meme fichier)
+TRADE_LOG_LOCK = None
 
 
-def log_trade(symbol: str, side: str, price: float, quantity: float, pnl: float = None):
+def log_trade(symbol: str, side: str, price: float, quantity: float, pnl: float = None, ts: float = None):
+    with TRADE_LOG_LOCK or nullcontext():
+        _write_trade(symbol, side, price, quantity, pnl, ts)
+
+
+def _write_trade(symbol, side, price, quantity, pnl, ts):
     is_new = not os.path.exists(TRADE_LOG_FILE)
     with open(TRADE_LOG_FILE, mode='a', newline='') as file:
         writer = csv.writer(file)
         if is_new:
             writer.writerow(["timestamp", "symbol", "side", "price", "quantity", "pnl"])
         writer.writerow([
-            datetime.utcnow().isoformat(),
+            (datetime.utcfromtimestamp(ts) if ts is not None else datetime.utcnow()).isoformat(),
             symbol,
             side,
             price,
@@ -1,5 +1,5 @@
 import typer
-from trading_bot.app.main import Bot
+from trading_bot.app.main import Bot, env_bool
 from trading_bot.app.exchange_binance import BinanceExchange
 from trading_bot.app.portfolio import get_portfolio_value
 import os
@@ -13,9 +13,43 @@ load_dotenv()
 app = typer.Typer()
 
 @app.command()
-def start():
+def start(record: str = typer.Option(None, help="enregistre la session (fichier gzip) pour la rejouer")):
     portfolio()
-    Bot().run_forever()
+    if not record:
+        Bot().run_forever()
+        return
+    from trading_bot.app.replay import record_bot
+    ex = BinanceExchange(BinanceExchange.env_from_os(env_bool('BINANCE_TESTNET', 'true')))
+    ex, clock, rec = record_bot(record, ex)
+    try:
+        Bot(exchange=ex, clock=clock).run_forever()
+    finally:
+        rec.close()
+
+@app.command()
+def replay(path: str, session: int = typer.Option(-1, help="index de la session (-1 = la derniere)")):
+    from trading_bot.app.replay import replay_session
+    bot = replay_session(path, session=session)
+    print(f"\n[REPLAY] PnL total : {bot.total_pnl:.2f} USDT | position ouverte : qty={bot.pos.qty}")
+
+@app.command()
+def supervise(
+    symbols: str = typer.Option(os.getenv('SYMBOLS', os.getenv('SYMBOL', 'BTCUSDT')), help="ex: BTCUSDT,ETHUSDT"),
+    workers: int = typer.Option(0, help="nb de process workers (0 = nb de CPU)"),
+):
+    from trading_bot.app.supervisor import Supervisor
+    syms = [s.strip().upper() for s in symbols.split(',') if s.strip()]
+    Supervisor(syms, workers=workers or None).run_forever()
+
+@app.command()
+def stream(
+    symbols: str = typer.Option(os.getenv('SYMBOLS', os.getenv('SYMBOL', 'BTCUSDT')), help="ex: BTCUSDT,ETHUSDT"),
+    url: str = typer.Option(None, help="URL WebSocket (ex: serveur local de rejeu)"),
+    record: str = typer.Option(None, help="enregistre les messages bruts (gzip) pour serve_recorded"),
+):
+    from trading_bot.app.stream import run_bot_streaming
+    syms = [s.strip().upper() for s in symbols.split(',') if s.strip()]
+    run_bot_streaming(syms, url=url, record_to=record)
 
 @app.command()
 def balance():
@@ -0,0 +1,14 @@
+"""Rend le depot importable sous le nom `trading_bot`, quel que soit le nom du dossier."""
+import importlib.util
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+if 'trading_bot' not in sys.modules:
+    _spec = importlib.util.spec_from_file_location(
+        'trading_bot', ROOT / '__init__.py', submodule_search_locations=[str(ROOT)]
+    )
+    _mod = importlib.util.module_from_spec(_spec)
+    sys.modules['trading_bot'] = _mod
+    _spec.loader.exec_module(_mod)
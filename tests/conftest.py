@@ -0,0 +1,21 @@
+import logging
+
+import pytest
+
+import _trading_bot  # noqa: F401  (alias `trading_bot` pour les imports de l'app)
+
+
+@pytest.fixture
+def bot_config(tmp_path, monkeypatch):
+    """Repertoire de travail avec trading_bot/config.yaml (lu par Bot et Supervisor)."""
+    cfg_dir = tmp_path / 'trading_bot'
+    cfg_dir.mkdir()
+    log_file = (tmp_path / 'logs' / 'bot.log').as_posix()
+    (cfg_dir / 'config.yaml').write_text(f"logging:\n  level: WARNING\n  file: {log_file}\n", encoding='utf-8')
+    monkeypatch.chdir(tmp_path)
+    yield tmp_path
+    # setup_logger ne reconfigure pas un logger deja equipe: on repart de zero
+    logger = logging.getLogger('firstapp')
+    for h in list(logger.handlers):
+        logger.removeHandler(h)
+        h.close()
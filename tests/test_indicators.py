@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+
+import _trading_bot  # noqa: F401
+from trading_bot.app import indicators as ind
+
+
+def _series(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    high = close + rng.random(n)
+    low = close - rng.random(n)
+    volume = rng.random(n) * 10
+    return high, low, close, volume
+
+
+def _stream(values):
+    return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+
+def _assert_agree(batch, streamed):
+    streamed = _stream(streamed)
+    assert np.array_equal(np.isnan(batch), np.isnan(streamed))
+    assert np.allclose(batch, streamed, equal_nan=True, rtol=1e-9, atol=1e-9)
+
+
+def _stream_tuple(obj, closes, size):
+    out = [obj.update(c) for c in closes]
+    return [[None if v is None else v[k] for v in out] for k in range(size)]
+
+
+def test_sma_agrees():
+    _, _, close, _ = _series()
+    o = ind.Sma(20)
+    _assert_agree(ind.sma(close, 20), [o.update(c) for c in close])
+
+
+def test_ema_agrees():
+    _, _, close, _ = _series()
+    o = ind.Ema(20)
+    _assert_agree(ind.ema(close, 20), [o.update(c) for c in close])
+
+
+def test_macd_agrees():
+    _, _, close, _ = _series()
+    batch = ind.macd(close)
+    o = ind.Macd()
+    out = [o.update(c) for c in close]
+    for k in range(3):
+        _assert_agree(batch[k], [v[k] for v in out])
+
+
+def test_bollinger_agrees():
+    _, _, close, _ = _series()
+    batch = ind.bollinger(close)
+    for b, s in zip(batch, _stream_tuple(ind.Bollinger(), close, 3)):
+        _assert_agree(b, s)
+
+
+def test_atr_agrees():
+    high, low, close, _ = _series()
+    o = ind.Atr(14)
+    _assert_agree(ind.atr(high, low, close, 14), [o.update(h, l, c) for h, l, c in zip(high, low, close)])
+
+
+def test_vwap_agrees():
+    high, low, close, volume = _series()
+    o = ind.Vwap()
+    _assert_agree(ind.vwap(high, low, close, volume),
+                  [o.update(h, l, c, v) for h, l, c, v in zip(high, low, close, volume)])
+
+
+def test_rsi_agrees():
+    _, _, close, _ = _series()
+    o = ind.Rsi(14)
+    _assert_agree(ind.rsi(close, 14), [o.update(c) for c in close])
+
+
+@pytest.mark.parametrize('n', [0, 1, 5])
+def test_input_shorter_than_period(n):
+    high, low, close, _ = _series(n)
+    assert np.isnan(ind.ema(close, 20)).all()
+    assert np.isnan(ind.rsi(close, 14)).all()
+    assert np.isnan(ind.atr(high, low, close, 14)).all()
+    for arr in ind.macd(close) + ind.bollinger(close):
+        assert len(arr) == n and np.isnan(arr).all()
+
+    rsi, ema, bb = ind.Rsi(14), ind.Ema(20), ind.Bollinger()
+    assert all(rsi.update(c) is None for c in close)
+    assert all(ema.update(c) is None for c in close)
+    assert all(bb.update(c) is None for c in close)
+
+
+def test_flat_prices():
+    close = np.full(60, 123.45)
+    assert np.all(ind.rsi(close, 14)[14:] == 50.0)
+    o = ind.Rsi(14)
+    assert [o.update(c) for c in close][14:] == [50.0] * 46
+
+    mid, upper, lower = ind.bollinger(close)
+    assert np.all(upper[19:] == mid[19:]) and np.all(lower[19:] == mid[19:])
+    bb = ind.Bollinger()
+    for c in close:
+        out = bb.update(c)
+    assert out[1] == out[0] == out[2] == 123.45
+
+
+def test_flat_segment_after_noise():
+    _, _, close, _ = _series(200)
+    close[100:140] = close[99]
+    batch = ind.bollinger(close)
+    for b, s in zip(batch, _stream_tuple(ind.Bollinger(), close, 3)):
+        _assert_agree(b, s)
+
+
+def test_vwap_zero_volume():
+    high, low, close, volume = _series(30)
+    volume[:5] = 0.0
+    batch = ind.vwap(high, low, close, volume)
+    assert np.isnan(batch[:5]).all()
+    o = ind.Vwap()
+    _assert_agree(batch, [o.update(h, l, c, v) for h, l, c, v in zip(high, low, close, volume)])
+
+    assert np.isnan(ind.vwap([1, 2], [1, 2], [1, 2], [0, 0])).all()
@@ -0,0 +1,25 @@
+import numpy as np
+
+import _trading_bot  # noqa: F401
+from trading_bot.app.market import KLINE_FIELDS, array_to_df, klines_to_array, klines_to_df
+
+
+def _klines(n):
+    return [[60000 * i, '1.5', '2', '1', str(10 + i), '3', 60000 * i + 59999, '0', 7, '0', '0', '0'] for i in range(n)]
+
+
+def test_klines_array_round_trip():
+    arr = klines_to_array(_klines(4))
+    assert arr.shape == (4, len(KLINE_FIELDS))
+    assert arr.dtype == np.float64
+
+    df = array_to_df(arr)
+    ref = klines_to_df(_klines(4))
+    assert list(df.columns) == KLINE_FIELDS
+    assert df['open_time'].dtype == np.int64
+    for c in KLINE_FIELDS:
+        assert df[c].tolist() == ref[c].tolist()
+
+
+def test_klines_to_array_empty():
+    assert klines_to_array([]).shape == (0, len(KLINE_FIELDS))
@@ -0,0 +1,44 @@
+import logging
+
+import _trading_bot  # noqa: F401
+from trading_bot.app.orders import OrderManager, RiskConfig
+
+
+class _Limiter:
+    def __init__(self, slots):
+        self.slots = slots
+
+    def try_acquire(self):
+        if self.slots <= 0:
+            return False
+        self.slots -= 1
+        return True
+
+
+def _om(per_bot, limiter=None):
+    risk = RiskConfig(stop_loss_pct=0.03, take_profit_pct=0.06, max_orders_per_min=per_bot)
+    return OrderManager(None, logging.getLogger('test'), risk, dry_run=True, rate_limiter=limiter)
+
+
+def test_local_window_limits_orders():
+    om = _om(per_bot=2)
+    assert om.market_buy('BTCUSDT', 1)
+    assert om.market_sell('BTCUSDT', 1)
+    assert om.market_buy('BTCUSDT', 1) is None
+
+
+def test_global_limiter_applies_on_top_of_local_window():
+    limiter = _Limiter(slots=1)
+    om = _om(per_bot=5, limiter=limiter)
+    assert om.market_buy('BTCUSDT', 1)
+    assert om.market_sell('BTCUSDT', 1) is None
+    # Refus global: le slot local n'est pas consomme
+    assert len(om._sent) == 1
+
+
+def test_local_refusal_does_not_consume_global_slot():
+    limiter = _Limiter(slots=5)
+    om = _om(per_bot=1, limiter=limiter)
+    om.market_buy('BTCUSDT', 1)
+    assert om.market_buy('BTCUSDT', 1) is None
+    assert limiter.slots == 4
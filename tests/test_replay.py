@@ -0,0 +1,153 @@
+import gzip
+import json
+import math
+import os
+import shutil
+import threading
+
+import dotenv
+import pytest
+
+import _trading_bot  # noqa: F401
+from trading_bot.app import main, replay
+from trading_bot.app.main import Bot
+
+
+class _SineExchange:
+    """Bougies sinusoidales decalees d'une barre par appel; KeyboardInterrupt apres `ticks` appels."""
+
+    def __init__(self, ticks):
+        self.ticks = ticks
+        self.i = 0
+
+    def fetch_klines(self, symbol, interval, limit):
+        self.i += 1
+        if self.i > self.ticks:
+            raise KeyboardInterrupt
+        return [[(j + self.i) * 60000, '1', '1', '1', str(30000 + 2000 * math.sin((j + self.i) / 6)), '1',
+                 0, 0, 0, 0, 0, 0] for j in range(limit)]
+
+    def precision_info(self, symbol):
+        return {'min_qty': 0.0001, 'step_size': 0.0001}
+
+
+@pytest.fixture
+def session_env(bot_config, monkeypatch):
+    env = {
+        'SYMBOL': 'BTCUSDT', 'INTERVAL': '1m', 'POLL_SECONDS': '0', 'BASE_ORDER_USDT': '25',
+        'DRY_RUN': 'true', 'BINANCE_TESTNET': 'true', 'SMA_SHORT': '5', 'SMA_LONG': '12',
+        'SMA_SEUIL_MIN': '1', 'SMA_SEUIL_PCT': '0.0005', 'SMA_CONFIRM_BARS': '1',
+        'STOP_LOSS_PCT': '0.03', 'TAKE_PROFIT_PCT': '0.06', 'MAX_OPEN_ORDERS_PER_MIN': '100',
+    }
+    for k in replay.ENV_KEYS:
+        monkeypatch.setenv(k, env[k])
+    return bot_config
+
+
+def _record(path, ticks, close=True):
+    ex, clock, rec = replay.record_bot(str(path), _SineExchange(ticks))
+    bot = Bot(exchange=ex, clock=clock)
+    bot.run_forever()
+    if close:
+        rec.close()
+    return bot, rec
+
+
+def _replay_with_timeout(path, **kwargs):
+    result = {}
+    t = threading.Thread(target=lambda: result.setdefault('bot', replay.replay_session(str(path), **kwargs)),
+                         daemon=True)
+    t.start()
+    t.join(timeout=60)
+    assert not t.is_alive(), "le rejeu ne se termine pas"
+    return result['bot']
+
+
+def test_record_replay_round_trip(session_env):
+    path = session_env / 'session.gz'
+    original, _ = _record(path, ticks=80)
+    assert original.total_pnl != 0.0  # au moins un aller-retour BUY/SELL
+
+    replayed = _replay_with_timeout(path)
+
+    assert replayed.total_pnl == original.total_pnl
+    assert replayed.pos == original.pos
+    assert (session_env / 'session.gz.trades.csv').read_text() == (session_env / 'trades.csv').read_text()
+
+
+def test_replay_picks_last_session_by_default(session_env, monkeypatch):
+    path = session_env / 'session.gz'
+    first, _ = _record(path, ticks=80)
+    monkeypatch.setenv('SMA_LONG', '15')
+    second, _ = _record(path, ticks=60)
+    assert replay.count_sessions(str(path)) == 2
+
+    assert _replay_with_timeout(path).total_pnl == second.total_pnl
+    assert _replay_with_timeout(path, session=0).total_pnl == first.total_pnl
+    with pytest.raises(ValueError):
+        replay.ReplaySource(str(path), session=2)
+
+
+def test_replay_truncated_recording_finishes(session_env):
+    path = session_env / 'session.gz'
+    original, rec = _record(path, ticks=20, close=False)
+    # Process mort: flux gzip flushe mais sans trailer
+    shutil.copy(path, session_env / 'crashed.gz')
+    rec.close()
+
+    replayed = _replay_with_timeout(session_env / 'crashed.gz')
+    assert replayed.pos == original.pos
+    assert replayed.total_pnl == original.total_pnl
+
+
+def test_replay_partial_last_line_finishes(session_env):
+    path = session_env / 'session.gz'
+    original, _ = _record(path, ticks=20)
+    with gzip.open(path, 'ab') as f:
+        f.write(b'{"k":"time","t":17')
+
+    replayed = _replay_with_timeout(path)
+    assert replayed.total_pnl == original.total_pnl
+
+
+def test_recording_after_crash_moves_partial_file_aside(session_env):
+    path = session_env / 'session.gz'
+    _, rec = _record(path, ticks=20, close=False)
+    shutil.copy(path, session_env / 'crashed.gz')
+    rec.close()
+    shutil.copy(session_env / 'crashed.gz', path)
+
+    new_rec = replay.Recorder(str(path))
+    new_rec.close()
+
+    assert new_rec.moved_partial is not None
+    assert replay.count_sessions(new_rec.moved_partial) == 1
+    assert replay.count_sessions(str(path)) == 1
+
+
+def test_klines_recorded_as_delta(session_env):
+    path = session_env / 'session.gz'
+    _record(path, ticks=30)
+
+    with gzip.open(path, 'rb') as f:
+        events = [e for e in map(json.loads, f) if e.get('m') == 'fetch_klines']
+    assert 'r' in events[0]
+    # Une bougie de plus par appel: seule la nouvelle ligne est ecrite
+    assert all(e['d'][:2] == [1, 199] and len(e['d'][2]) == 1 for e in events[1:])
+
+
+def test_replay_restores_env_and_ignores_dotenv(session_env, monkeypatch):
+    path = session_env / 'session.gz'
+    monkeypatch.delenv('SMA_CONFIRM_BARS')
+    original, _ = _record(path, ticks=80)
+    monkeypatch.setenv('SMA_LONG', '30')
+    # .env du poste de rejeu: ne doit pas remplir la cle enregistree absente
+    (session_env / '.env').write_text('SMA_CONFIRM_BARS=7\n', encoding='utf-8')
+    monkeypatch.setattr(main, 'load_dotenv', lambda *a, **kw: dotenv.load_dotenv(session_env / '.env'))
+
+    replayed = _replay_with_timeout(path)
+
+    assert replayed.strategy.p.confirm_bars == 3
+    assert replayed.total_pnl == original.total_pnl
+    assert os.environ['SMA_LONG'] == '30'
+    assert 'SMA_CONFIRM_BARS' not in os.environ
@@ -0,0 +1,272 @@
+import asyncio
+import gzip
+import json
+import logging
+import threading
+import time
+
+import _trading_bot  # noqa: F401
+from trading_bot.app import stream as st
+from trading_bot.app.main import Bot
+
+MINUTE = 60000
+# Bougies dans le passe: toutes "fermees" au sens de l'horloge murale
+BASE = (int(time.time() * 1000) // MINUTE - 20) * MINUTE
+
+
+def _t(i):
+    return BASE + i * MINUTE
+
+
+def _kline(i, close, closed):
+    return json.dumps({'stream': 'btcusdt@kline_1m', 'data': {
+        'e': 'kline', 's': 'BTCUSDT',
+        'k': {'t': _t(i), 'T': _t(i) + MINUTE - 1, 'o': '1', 'h': '1', 'l': '1', 'c': str(close), 'v': '1',
+              'q': '1', 'n': 1, 'V': '1', 'Q': '1', 'x': closed}}})
+
+
+def _ticker(price):
+    return json.dumps({'stream': 'btcusdt@ticker', 'data': {'e': '24hrTicker', 's': 'BTCUSDT', 'c': str(price)}})
+
+
+def _rest_row(i, close, open_bar=False):
+    close_time = _t(i) + MINUTE - 1 if not open_bar else int(time.time() * 1000) + 10 * MINUTE
+    return [_t(i), '1', '1', '1', str(close), '1', close_time, '1', 1, '1', '1', '0']
+
+
+MESSAGES = [
+    _kline(0, 10, True),
+    _kline(1, 11, False),
+    _ticker(11.5),
+    _kline(1, 12, True),
+    _kline(0, 10, True),    # doublon
+    _kline(1, 11.9, False),  # mise a jour perimee (bougie deja fermee)
+    _kline(2, 13, False),
+]
+
+
+class _FakeExchange:
+    """fetch_klines: 1er appel vide; ensuite `later` (bougies manquees pendant la coupure)."""
+
+    def __init__(self, later):
+        self.later = later
+        self.calls = 0
+
+    def fetch_klines(self, symbol, interval, limit):
+        self.calls += 1
+        return [] if self.calls == 1 else self.later
+
+
+def _write(path, messages):
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        f.write('\n'.join(messages) + '\n')
+
+
+async def _run_until(ms, cond, timeout=10.0):
+    task = asyncio.create_task(ms.run())
+    deadline = time.monotonic() + timeout
+    while not cond() and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    await ms.stop()
+    await asyncio.wait_for(task, timeout)
+    assert cond()
+
+
+def _stream(url, ex, got, **kwargs):
+    return st.MarketStream(['BTCUSDT'], '1m', ex, url=url, log=logging.getLogger('test'),
+                           on_bar=lambda s, r, c: got.append((int(r[0]), float(r[4]), c)), **kwargs)
+
+
+def test_stream_dispatch_dedup_and_ticker(tmp_path):
+    _write(tmp_path / 'msgs.gz', MESSAGES)
+    got = []
+
+    async def main():
+        server, url = await st.serve_recorded(tmp_path / 'msgs.gz')
+        ms = _stream(url, _FakeExchange(later=[]), got, reconnect_min=30)
+        try:
+            await _run_until(ms, lambda: ms.reconnects >= 1)
+        finally:
+            server.close()
+            await server.wait_closed()
+        return ms
+
+    ms = asyncio.run(main())
+
+    assert got == [(_t(0), 10.0, True), (_t(1), 11.0, False), (_t(1), 12.0, True), (_t(2), 13.0, False)]
+    assert ms.prices == {'BTCUSDT': 11.5}
+    assert [float(c) for c in ms.read('BTCUSDT')['close']] == [10.0, 12.0, 13.0]
+
+
+def test_stream_backfills_missed_bars_after_disconnect(tmp_path):
+    _write(tmp_path / 'msgs.gz', MESSAGES)
+    later = [_rest_row(i, 100 + i) for i in range(5)] + [_rest_row(5, 105, open_bar=True)]
+    ex = _FakeExchange(later=later)
+    got = []
+
+    async def main():
+        server, url = await st.serve_recorded(tmp_path / 'msgs.gz')
+        ms = _stream(url, ex, got, reconnect_min=0.01)
+        try:
+            await _run_until(ms, lambda: ms.reconnects >= 2)
+        finally:
+            server.close()
+            await server.wait_closed()
+        return ms
+
+    ms = asyncio.run(main())
+
+    first_connection = got[:4]
+    backfill = got[4:]
+    assert first_connection[-1] == (_t(2), 13.0, False)
+    # Deja fermees (0, 1): ignorees; 2 passe de "en cours" a fermee; 3, 4 manquees; 5 en cours
+    assert backfill[:4] == [(_t(2), 102.0, True), (_t(3), 103.0, True), (_t(4), 104.0, True), (_t(5), 105.0, False)]
+    # Messages rejoues a la reconnexion: anterieurs, ignores. Seule la bougie en cours
+    # peut etre re-dispatchee par un backfill ulterieur.
+    assert set(backfill[4:]) <= {(_t(5), 105.0, False)}
+    assert ms.read('BTCUSDT')['close'].tolist()[-4:] == [102.0, 103.0, 104.0, 105.0]
+    assert ex.calls >= 2
+
+
+def test_record_to_round_trips_through_stand_in_server(tmp_path):
+    _write(tmp_path / 'msgs.gz', MESSAGES)
+    got = []
+
+    async def main():
+        server, url = await st.serve_recorded(tmp_path / 'msgs.gz')
+        ms = _stream(url, _FakeExchange(later=[]), got, reconnect_min=30, record_to=tmp_path / 'rec.gz')
+        try:
+            await _run_until(ms, lambda: ms.reconnects >= 1)
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(main())
+
+    with gzip.open(tmp_path / 'rec.gz', 'rt', encoding='utf-8') as f:
+        assert [line.rstrip('\n') for line in f] == MESSAGES
+
+
+def test_serve_recorded_stops_at_last_complete_line(tmp_path):
+    # Process mort en cours d'enregistrement: pas de trailer gzip, derniere ligne partielle
+    with gzip.open(tmp_path / 'rec.gz', 'wb') as f:
+        f.write(('\n'.join(MESSAGES) + '\n').encode('utf-8'))
+        f.write(b'{"stream": "btcusdt@tic')
+        f.flush()
+        (tmp_path / 'crashed.gz').write_bytes((tmp_path / 'rec.gz').read_bytes())
+    got = []
+
+    async def main():
+        server, url = await st.serve_recorded(tmp_path / 'crashed.gz')
+        ms = _stream(url, _FakeExchange(later=[]), got, reconnect_min=30)
+        try:
+            await _run_until(ms, lambda: ms.reconnects >= 1)
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(main())
+
+    assert got == [(_t(0), 10.0, True), (_t(1), 11.0, False), (_t(1), 12.0, True), (_t(2), 13.0, False)]
+
+
+def test_cancelled_stream_closes_recording(tmp_path):
+    _write(tmp_path / 'msgs.gz', MESSAGES * 50)
+    got = []
+
+    async def main():
+        server, url = await st.serve_recorded(tmp_path / 'msgs.gz', delay=0.01)
+        ms = _stream(url, _FakeExchange(later=[]), got, reconnect_min=30, record_to=tmp_path / 'rec.gz')
+        task = asyncio.create_task(ms.run())
+        try:
+            while not got:
+                await asyncio.sleep(0.01)
+            task.cancel()  # CTRL+C sous asyncio.run
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            # Lu pendant que le stream existe encore: lecture complete sans EOFError,
+            # le trailer gzip a ete ecrit a l'annulation
+            with gzip.open(tmp_path / 'rec.gz', 'rt', encoding='utf-8') as f:
+                return [line.rstrip('\n') for line in f]
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    recorded = asyncio.run(main())
+
+    assert recorded and recorded == (MESSAGES * 50)[:len(recorded)]
+
+
+class _SlowBot:
+    symbol = 'BTCUSDT'
+    interval = '1m'
+
+    def __init__(self):
+        self.log = logging.getLogger('test')
+        self.seen = []
+        self.threads = set()
+
+    def tick(self):
+        self.threads.add(threading.get_ident())
+        time.sleep(0.1)
+        self.seen.append(float(self.market(self.symbol, self.interval, 200)['close'].iloc[-1]))
+
+
+def test_bot_runner_ticks_off_loop_in_order():
+    class _Stream:
+        rows = []
+
+        def bars(self, symbol):
+            return list(self.rows)
+
+    bot = _SlowBot()
+    stream = _Stream()
+
+    async def main():
+        runner = st._BotRunner(bot, stream)
+        task = asyncio.create_task(runner.run())
+        for i in range(3):
+            stream.rows = stream.rows + [_rest_row(i, 10 + i)]
+            runner.submit()
+        # La boucle reste reactive pendant les ticks (0.1 s chacun)
+        t0 = time.monotonic()
+        await asyncio.sleep(0.01)
+        lag = time.monotonic() - t0
+        while len(bot.seen) < 3:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        return lag
+
+    lag = asyncio.run(main())
+
+    assert lag < 0.08
+    assert bot.seen == [10.0, 11.0, 12.0]
+    assert threading.get_ident() not in bot.threads
+
+
+def test_bot_runner_checks_stop_loss_on_ticker(bot_config, monkeypatch):
+    monkeypatch.setenv('DRY_RUN', 'true')
+    bot = Bot(symbol='BTCUSDT', exchange=object())
+    bot.pos.qty, bot.pos.entry_price = 0.5, 100.0
+    checked = []
+    check_risk = bot.check_risk
+    bot.check_risk = lambda price: checked.append(price) or check_risk(price)
+
+    async def main():
+        runner = st._BotRunner(bot, stream=None)
+        task = asyncio.create_task(runner.run())
+        # Tickers plus rapides que les controles: un seul controle, au dernier prix
+        for price in (101.0, 99.0, 90.0):
+            runner.submit_price(price)
+        while bot.pos.is_open():
+            await asyncio.sleep(0.01)
+        runner.submit_price(80.0)  # plus de position: rien a controler
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+    asyncio.run(main())
+
+    assert checked == [90.0]
+    assert bot.total_pnl == -5.0
@@ -0,0 +1,257 @@
+import logging
+import multiprocessing as mp
+import queue
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import _trading_bot  # noqa: F401
+from trading_bot.app import supervisor
+from trading_bot.app.main import Bot
+from trading_bot.app.orders import OrderManager, RiskConfig
+from trading_bot.app.portfolio import Position
+from trading_bot.app.supervisor import (SharedKlines, SharedRateLimiter, Supervisor, WeightBudget,
+                                        worker_log_path)
+
+
+def _klines(closes):
+    return [[60000 * i, '1', '1', '1', str(c), '1', 0, 0, 0, 0, 0, 0] for i, c in enumerate(closes)]
+
+
+def _read_in_child(klines, limiter, q):
+    q.put((klines.read('ETHUSDT', None, 3)['close'].tolist(), klines.last_close('BTCUSDT'), limiter.try_acquire()))
+
+
+def test_shared_klines_round_trip_across_spawn_process():
+    ctx = mp.get_context('spawn')
+    klines = SharedKlines(['BTCUSDT', 'ETHUSDT'], limit=5, ctx=ctx)
+    limiter = SharedRateLimiter(1, ctx=ctx)
+    try:
+        klines.publish('BTCUSDT', _klines(range(10, 18)))  # 8 bougies, seules les 5 dernieres restent
+        klines.publish('ETHUSDT', _klines([20, 21]))
+        q = ctx.Queue()
+        p = ctx.Process(target=_read_in_child, args=(klines, limiter, q))
+        p.start()
+        eth, btc_last, acquired = q.get(timeout=60)
+        p.join(timeout=10)
+
+        assert eth == [20.0, 21.0]
+        assert btc_last == 17.0
+        assert acquired is True
+        # Le slot pris par l'enfant est visible du parent
+        assert limiter.try_acquire() is False
+        assert klines.read('BTCUSDT')['close'].tolist() == [13.0, 14.0, 15.0, 16.0, 17.0]
+    finally:
+        klines.close()
+
+
+def test_shared_klines_empty_symbol():
+    klines = SharedKlines(['BTCUSDT'], limit=3)
+    try:
+        assert klines.last_close('BTCUSDT') is None
+        assert len(klines.read('BTCUSDT')) == 0
+    finally:
+        klines.close()
+
+
+def test_rate_limiter_refuses_extra_order_inside_window():
+    limiter = SharedRateLimiter(3, window_seconds=0.2)
+    assert [limiter.try_acquire() for _ in range(4)] == [True, True, True, False]
+    time.sleep(0.25)
+    assert limiter.try_acquire() is True
+
+
+def test_worker_log_path():
+    assert worker_log_path('logs/bot.log', 2).replace('\\', '/') == 'logs/bot.worker2.log'
+
+
+class _FakeBot:
+    stop = None
+
+    def __init__(self, symbol, exchange, market, rate_limiter):
+        self.symbol = symbol
+        self.ex = exchange or object()
+        self.log = logging.getLogger('firstapp')
+        self.pos = Position(symbol=symbol)
+        self.total_pnl = 0.0
+
+    def tick(self):
+        _FakeBot.stop.set()
+
+
+def test_worker_restores_positions(bot_config, monkeypatch):
+    monkeypatch.setattr(supervisor, 'Bot', _FakeBot)
+    monkeypatch.setattr(supervisor.trade_logger, 'TRADE_LOG_LOCK', None)
+    _FakeBot.stop = threading.Event()
+    status_q = queue.Queue()
+    klines = SimpleNamespace(generation=SimpleNamespace(value=1), read=None)
+    log_cfg = {'level': 'WARNING', 'file': str(bot_config / 'logs' / 'bot.log')}
+
+    supervisor._worker_main(0, ['BTCUSDT', 'ETHUSDT'], klines, None, status_q, _FakeBot.stop,
+                            {'BTCUSDT': (0.5, 100.0, 3.0)}, log_cfg, threading.Lock())
+
+    reported = dict((s[0], s[1:]) for s in [status_q.get_nowait(), status_q.get_nowait()])
+    assert reported == {'BTCUSDT': (0.5, 100.0, 3.0), 'ETHUSDT': (0.0, 0.0, 0.0)}
+    assert (bot_config / 'logs' / 'bot.worker0.log').exists()
+
+
+class _FakeProcess:
+    spawned = []
+
+    def __init__(self, target, args, name, daemon):
+        self.args = args
+        self.alive = False
+        self.exitcode = None
+        _FakeProcess.spawned.append(self)
+
+    def start(self):
+        self.alive = True
+
+    def is_alive(self):
+        return self.alive
+
+
+class _FakeExchange:
+    def __init__(self, cfg):
+        pass
+
+    @staticmethod
+    def env_from_os(testnet):
+        return None
+
+
+@pytest.fixture
+def fake_supervisor(bot_config, monkeypatch):
+    monkeypatch.setattr(supervisor, 'BinanceExchange', _FakeExchange)
+    monkeypatch.setattr(supervisor.mp, 'Process', _FakeProcess)
+    monkeypatch.setenv('MAX_OPEN_ORDERS_PER_MIN', '3')
+    monkeypatch.delenv('MAX_ORDERS_PER_MIN_GLOBAL', raising=False)
+    _FakeProcess.spawned = []
+    sup = Supervisor(['BTCUSDT', 'ETHUSDT'], workers=1)
+    yield sup
+    sup.klines.close()
+
+
+def _crash(sup, worker_id=0):
+    sup.procs[worker_id].alive = False
+    sup.procs[worker_id].exitcode = 1
+
+
+def test_supervisor_global_budget_is_account_level(fake_supervisor):
+    # Independant du nombre de symboles (2 ici) et de la limite par bot (3)
+    assert len(fake_supervisor.limiter._stamps) == 10
+
+
+def test_two_bots_cannot_exceed_global_budget():
+    limiter = SharedRateLimiter(2)
+    risk = RiskConfig(stop_loss_pct=0.03, take_profit_pct=0.06, max_orders_per_min=5)
+    a = OrderManager(None, logging.getLogger('test'), risk, dry_run=True, rate_limiter=limiter)
+    b = OrderManager(None, logging.getLogger('test'), risk, dry_run=True, rate_limiter=limiter)
+
+    sent = [a.market_buy('BTCUSDT', 1), b.market_buy('ETHUSDT', 1), a.market_sell('BTCUSDT', 1),
+            b.market_sell('ETHUSDT', 1)]
+
+    # Chacun reste sous sa limite locale (5), mais le compte plafonne a 2
+    assert [bool(r) for r in sent] == [True, True, False, False]
+
+
+def test_supervisor_global_budget_from_env(bot_config, monkeypatch):
+    monkeypatch.setattr(supervisor, 'BinanceExchange', _FakeExchange)
+    monkeypatch.setenv('MAX_ORDERS_PER_MIN_GLOBAL', '10')
+    sup = Supervisor(['BTCUSDT'], workers=1)
+    try:
+        assert len(sup.limiter._stamps) == 10
+    finally:
+        sup.klines.close()
+
+
+def test_restart_restores_last_known_positions(fake_supervisor):
+    sup = fake_supervisor
+    sup.restart_backoff_max = 0
+    sup._spawn(0)
+    sup.status = {'BTCUSDT': (0.5, 100.0, 3.0)}
+    _crash(sup)
+
+    sup._check_workers()
+
+    assert len(_FakeProcess.spawned) == 2
+    restore = _FakeProcess.spawned[-1].args[6]
+    assert restore == {'BTCUSDT': (0.5, 100.0, 3.0)}
+
+
+def test_restart_waits_for_backoff(fake_supervisor):
+    sup = fake_supervisor
+    sup._spawn(0)
+    _crash(sup)
+
+    sup._check_workers()
+    sup._check_workers()
+
+    assert len(_FakeProcess.spawned) == 1
+    assert sup._retry_at[0] > time.time()
+
+
+def test_restart_gives_up_after_max_restarts(fake_supervisor):
+    sup = fake_supervisor
+    sup.restart_backoff_max = 0
+    sup.max_restarts = 2
+    sup._spawn(0)
+    for _ in range(4):
+        _crash(sup)
+        sup._check_workers()
+
+    assert len(_FakeProcess.spawned) == 3
+    assert 0 in sup._abandoned
+
+
+def test_stop_loss_exit_counts_in_aggregated_pnl(fake_supervisor, monkeypatch):
+    monkeypatch.setenv('DRY_RUN', 'true')
+    sup = fake_supervisor
+    sup.klines.publish('BTCUSDT', _klines([90.0] * 60))
+    bot = Bot(symbol='BTCUSDT', exchange=object(), market=sup.klines.read)
+    bot.pos.qty, bot.pos.entry_price = 0.5, 100.0
+
+    bot.tick()  # -10% < -3%: stop-loss
+    sup.status_q = queue.Queue()  # file locale: pas de thread d'alimentation mp
+    sup.status_q.put((bot.symbol, bot.pos.qty, bot.pos.entry_price, bot.total_pnl))
+    sup._drain_status()
+
+    assert not bot.pos.is_open()
+    assert sup.aggregate() == {'open_positions': 0, 'realized_pnl': -5.0, 'unrealized_pnl': 0.0}
+
+
+class _KlinesExchange:
+    def __init__(self, barrier=None):
+        self.barrier = barrier
+        self.calls = []
+
+    def fetch_klines(self, symbol, interval, limit):
+        self.calls.append(symbol)
+        if self.barrier is not None:
+            self.barrier.wait()  # ne passe que si les deux appels sont en vol en meme temps
+        return _klines([1.0, 2.0])
+
+
+def test_publish_fetches_symbols_in_parallel(fake_supervisor):
+    sup = fake_supervisor
+    sup.ex = _KlinesExchange(threading.Barrier(2, timeout=5))
+
+    sup._publish()
+
+    assert sup.klines.last_close('BTCUSDT') == 2.0
+    assert sup.klines.last_close('ETHUSDT') == 2.0
+    assert sup.klines.generation.value == 1
+
+
+def test_publish_respects_weight_budget_and_rotates(fake_supervisor):
+    sup = fake_supervisor
+    sup.ex = _KlinesExchange()
+    # limit=200 -> poids 2: un seul symbole par fenetre
+    sup.weight_budget = WeightBudget(2)
+    sup._publish()
+    sup.weight_budget = WeightBudget(2)  # fenetre suivante
+    sup._publish()
+
+    assert sup.ex.calls == ['BTCUSDT', 'ETHUSDT']